@@ -1,21 +1,284 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 from groq import Groq
-import plotly.express as px
 from datetime import datetime
-import json
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter, landscape
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+import orjson
 from io import BytesIO
 import base64
-from reportlab.lib.units import inch
-from reportlab.graphics import renderPDF
-from reportlab.graphics.shapes import Drawing
-import plotly.io as pio
-from reportlab.platypus.flowables import Image
 import os
+import re
+from types import MappingProxyType
+
+# Long meal days are emitted as several bounded tables; a table can still split at a
+# page boundary, so each one repeats its header row
+MEAL_TABLE_MAX_ROWS = 10
+
+DAY_NAMES = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+MEAL_NAMES = ('Breakfast', 'Morning Snack', 'Lunch', 'Afternoon Snack', 'Dinner')
+_DAY_RE = re.compile(r'\b(?:' + '|'.join(DAY_NAMES) + r')\b')
+_MEAL_RE = re.compile(r'\b(?:' + '|'.join(MEAL_NAMES) + r')\b')
+
+# Template for the client profile; copied into session state on first run.
+# List-valued fields default to tuples so copies never share a mutable list with it.
+_DEFAULT_CLIENT_INFO = MappingProxyType({
+    'name': '',
+    'age': 0,
+    'occupation': '',
+    'previous_yoga_experience': '',
+    'primary_goals': (),
+    'specific_concerns': '',
+    'medical_history': '',
+    'current_medications': '',
+    'work_activity_level': '',
+    'stress_sources': (),
+    'exercise_routine': '',
+    'sleep_hours': 7,
+    'diet_type': '',
+    'height': 170,
+    'weight': 70,
+    'target_weight': 70,
+    'dietary_restrictions': ('None',),
+    'food_allergies': '',
+    'preferred_cuisine': ('Mediterranean',),
+    'meal_prep_time': 30,
+    'medical_conditions': '',
+    'digestive_issues': '',
+    'health_goals': ('Maintenance',),
+    'nutritional_needs': ''
+})
+
+# Option lists for the client and diet widgets
+_SESSION_TYPES = ("In-person", "Online", "Healing-focused")
+_YOGA_EXPERIENCE_LEVELS = ("None", "Beginner", "Intermediate", "Advanced")
+_MEAL_PREP_TIMES = (15, 30, 45, 60, 90, 120)
+_DIET_RESTRICTIONS = ("None", "Vegetarian", "Vegan", "Gluten-Free", "Dairy-Free", "Keto", "Paleo")
+_CUISINES = ("Mediterranean", "Asian", "Indian", "Mexican", "American", "European")
+_HEALTH_GOALS = ("Weight Loss", "Muscle Gain", "Maintenance", "Energy Boost",
+                 "Better Sleep", "Digestive Health", "Reduce Inflammation")
+
+# client_info fields edited on the Diet Plan section; each widget is keyed diet_<field>
+_DIET_FIELDS = ('height', 'weight', 'target_weight', 'meal_prep_time', 'dietary_restrictions',
+                'food_allergies', 'preferred_cuisine', 'medical_conditions', 'digestive_issues',
+                'health_goals', 'nutritional_needs')
+
+# Assessment score keys in a fixed order, with the labels used on the comparison charts
+PHYSICAL_KEYS = ('flexibility', 'strength', 'balance', 'pain', 'posture',
+                 'breathing', 'spine', 'hips', 'shoulders', 'core')
+PHYSICAL_LABELS = ('Flexibility', 'Strength', 'Balance', 'Pain Level', 'Posture',
+                   'Breathing', 'Spine', 'Hips', 'Shoulders', 'Core')
+MENTAL_KEYS = ('stress', 'energy', 'focus', 'sleep', 'anxiety', 'mood', 'mindfulness')
+MENTAL_LABELS = ('Stress', 'Energy', 'Focus', 'Sleep', 'Anxiety', 'Mood', 'Mindfulness')
+METRIC_KEYS = PHYSICAL_KEYS + MENTAL_KEYS
+
+# (slider label, assessment key, category) for the Before/After assessment tabs
+METRICS = (
+    ("Flexibility Level", 'flexibility', 'physical'),
+    ("Strength Level", 'strength', 'physical'),
+    ("Balance Score", 'balance', 'physical'),
+    ("Pain Level", 'pain', 'physical'),
+    ("Posture", 'posture', 'physical'),
+    ("Breathing Level", 'breathing', 'physical'),
+    ("Spine Flexibility Level", 'spine', 'physical'),
+    ("Hip Mobility Level", 'hips', 'physical'),
+    ("Shoulder Mobility Level", 'shoulders', 'physical'),
+    ("Core Strength Level", 'core', 'physical'),
+    ("Stress Level", 'stress', 'mental'),
+    ("Energy Level", 'energy', 'mental'),
+    ("Focus & Clarity", 'focus', 'mental'),
+    ("Sleep Quality", 'sleep', 'mental'),
+    ("Anxiety Level", 'anxiety', 'mental'),
+    ("Overall Mood", 'mood', 'mental'),
+    ("Mindfulness", 'mindfulness', 'mental')
+)
+METRIC_GROUPS = (
+    ('physical', "### 💪 Physical Metrics"),
+    ('mental', "### 🧘‍♀️ Mental & Emotional Metrics")
+)
+
+# Template for a blank before/after assessment; copied into session state on first run.
+# Scores stay None until the assessment is saved, since 0 is a valid score.
+_DEFAULT_ASSESSMENT = MappingProxyType({
+    **dict.fromkeys(METRIC_KEYS),
+    'notes': '',
+    'limitations': '',
+    'symptoms': ''
+})
+
+_CSS = """
+<style>
+/* Main container */
+.main {
+    padding: 2rem;
+}
+
+/* Headers */
+h1 {
+    color: #2E4057;
+    padding-bottom: 1.5rem;
+}
+
+h2 {
+    color: #2E4057;
+    font-size: 1.8rem;
+    padding: 1rem 0;
+}
+
+h3 {
+    color: #2E4057;
+    font-size: 1.4rem;
+    padding: 0.8rem 0;
+}
+
+/* Slider styling */
+.stSlider {
+    padding: 1rem 0;
+}
+
+.stSlider > div > div {
+    background-color: #f0f2f6;
+}
+
+/* Input fields */
+.stTextInput > div > div {
+    background-color: #ffffff;
+    border-radius: 5px;
+}
+
+/* Cards for metric groups */
+.metric-card {
+    background-color: #ffffff;
+    padding: 1.5rem;
+    border-radius: 10px;
+    box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+    margin-bottom: 1rem;
+}
+</style>
+"""
+
+# Comparison bars only need hover values, so the Plotly modebar is dropped
+_PLOTLY_CONFIG = {'displayModeBar': False, 'responsive': True}
+
+_CARD_TPL = '<div class="metric-card"><h3>{}</h3>{}</div>'
+
+# Response token ceilings. The analysis keeps the original 3000 until real output
+# lengths have been measured; a lower cap would truncate the eight-section report.
+ANALYSIS_MAX_TOKENS = 3000
+DIET_PLAN_MAX_TOKENS = 3000
+
+# (prompt label, assessment key) pairs listed in the analysis prompt
+BASIC_PHYSICAL_METRICS = (
+    ('Flexibility', 'flexibility'),
+    ('Strength', 'strength'),
+    ('Balance', 'balance'),
+    ('Pain Levels', 'pain')
+)
+DETAILED_PHYSICAL_METRICS = (
+    ('Posture', 'posture'),
+    ('Breathing', 'breathing'),
+    ('Spine Flexibility', 'spine'),
+    ('Hip Mobility', 'hips'),
+    ('Shoulder Mobility', 'shoulders'),
+    ('Core Strength', 'core')
+)
+MENTAL_METRICS = (
+    ('Stress Levels', 'stress'),
+    ('Energy Levels', 'energy'),
+    ('Focus & Clarity', 'focus'),
+    ('Sleep Quality', 'sleep'),
+    ('Anxiety Levels', 'anxiety'),
+    ('Overall Mood', 'mood'),
+    ('Mindfulness', 'mindfulness')
+)
+
+# Static analysis instructions, filled per client with str.format
+_ANALYSIS_TEMPLATE = """
+As an expert yoga trainer and wellness analyst, provide a detailed progress analysis for:
+
+CLIENT PROFILE:
+Name: {client[name]}
+Age: {client[age]}
+Occupation: {client[occupation]}
+Previous Yoga Experience: {client[previous_yoga_experience]}
+Primary Goals: {primary_goals}
+
+COMPREHENSIVE ASSESSMENT COMPARISON:
+
+1. PHYSICAL METRICS ANALYSIS:
+
+Basic Metrics:
+{basic_metrics}
+
+Detailed Physical Assessment:
+{detailed_metrics}
+
+2. MENTAL & EMOTIONAL METRICS:
+
+{mental_metrics}
+
+Lifestyle Factors:
+- Work Activity Level: {client[work_activity_level]}
+- Exercise Routine: {client[exercise_routine]}
+- Sleep Hours: {client[sleep_hours]}
+- Diet Type: {client[diet_type]}
+- Stress Sources: {stress_sources}
+
+Initial Limitations/Symptoms:
+{before[limitations]}
+{before[symptoms]}
+
+Current Notes:
+Before: {before[notes]}
+After: {after[notes]}
+
+Please provide a detailed analysis with the following sections:
+
+1. EXECUTIVE SUMMARY
+Provide a concise overview of the client's overall progress and key achievements.
+
+2. PHYSICAL PROGRESS ANALYSIS
+- Detailed analysis of improvements in all physical metrics
+- Specific areas of notable improvement
+- Areas requiring continued attention
+
+3. MENTAL & EMOTIONAL WELLNESS PROGRESS
+- Comprehensive analysis of mental and emotional improvements
+- Impact on daily life and wellbeing
+- Notable behavioral changes
+
+4. KEY ACHIEVEMENTS
+List the top 3-5 most significant improvements observed.
+
+5. AREAS FOR FOCUS
+Identify 2-3 specific areas that need continued attention and work.
+
+6. PERSONALIZED RECOMMENDATIONS
+Provide 4-5 specific, actionable recommendations for:
+- Poses or exercises to practice
+- Lifestyle adjustments
+- Mental wellness practices
+- Sleep hygiene improvements (if applicable)
+
+7. LONG-TERM OUTLOOK
+- Projected benefits if current progress continues
+- Potential milestones to work towards
+- Timeline expectations
+
+8. MOTIVATIONAL INSIGHTS
+End with a personalized motivational message that:
+- Acknowledges their progress
+- Encourages continued dedication
+- Highlights their potential for further growth
+
+Please format the response clearly with headers and bullet points where appropriate.
+Focus on being specific, actionable, and encouraging while maintaining a professional tone.
+"""
+
+# Cache keys for the assessment/client dicts: one sorted orjson dump instead of pickling
+def _hash_dict(data):
+    return orjson.dumps(data, option=orjson.OPT_SORT_KEYS)
+
+_CACHE_HASH_FUNCS = {dict: _hash_dict}
 
 # Set page config first, before any other Streamlit commands
 st.set_page_config(
@@ -24,6 +287,9 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
+# Streamlit re-executes this module on every rerun; cache_resource keeps one
+# client (and its HTTP connection pool) per process instead of one per rerun
+@st.cache_resource
 def get_groq_client():
     """Initialize Groq client with API key from environment or secrets."""
     api_key = None
@@ -52,273 +318,98 @@ except Exception as e:
     st.error(f"Failed to initialize Groq client: {str(e)}")
     st.stop()
 
+def stream_completion(prompt, max_tokens):
+    """Send a single-turn prompt to Groq and yield the response text as it arrives."""
+    response = groq_client.chat.completions.create(
+        messages=[{"role": "user", "content": prompt}],
+        model="meta-llama/llama-4-maverick-17b-128e-instruct",
+        temperature=0.7,
+        max_tokens=max_tokens,
+        top_p=0.95,
+        stream=True
+    )
+    
+    for chunk in response:
+        yield chunk.choices[0].delta.content or ""
+
 def initialize_session_state():
-    default_data = {
-        'flexibility': 0,
-        'strength': 0,
-        'balance': 0,
-        'pain': 0,
-        'posture': 0,
-        'breathing': 0,
-        'spine': 0,
-        'hips': 0,
-        'shoulders': 0,
-        'core': 0,
-        'stress': 0,
-        'energy': 0,
-        'focus': 0,
-        'sleep': 0,
-        'anxiety': 0,
-        'mood': 0,
-        'mindfulness': 0,
-        'notes': '',
-        'limitations': '',
-        'symptoms': ''
-    }
+    if ('before_data' in st.session_state and 'after_data' in st.session_state
+            and 'client_info' in st.session_state and 'session_date' in st.session_state):
+        return
     
     if 'before_data' not in st.session_state:
-        st.session_state.before_data = default_data.copy()
+        st.session_state.before_data = dict(_DEFAULT_ASSESSMENT)
     if 'after_data' not in st.session_state:
-        st.session_state.after_data = default_data.copy()
+        st.session_state.after_data = dict(_DEFAULT_ASSESSMENT)
     if 'client_info' not in st.session_state:
-        st.session_state.client_info = {
-            'name': '',
-            'age': 0,
-            'medical_history': '',
-            'current_medications': '',
-            'previous_yoga_experience': '',
-            'primary_goals': [],
-            'specific_concerns': '',
-            'occupation': '',
-            'work_activity_level': '',
-            'stress_sources': [],
-            'exercise_routine': '',
-            'sleep_hours': 7,
-            'diet_type': ''
-        }
+        st.session_state.client_info = dict(_DEFAULT_CLIENT_INFO)
+    if 'session_date' not in st.session_state:
+        # Fixed per session so download file names don't change mid-session
+        st.session_state.session_date = datetime.now().strftime('%Y%m%d')
 
+def assessment_scores(before_data, after_data, keys):
+    """Stack the before/after scores for keys into a (2, len(keys)) int8 array."""
+    return np.stack([
+        np.fromiter((before_data[key] for key in keys), dtype=np.int8, count=len(keys)),
+        np.fromiter((after_data[key] for key in keys), dtype=np.int8, count=len(keys))
+    ])
+
+@st.cache_data(ttl=3600, max_entries=50, show_spinner=False, hash_funcs=_CACHE_HASH_FUNCS)
 def create_comparison_charts(before_data, after_data):
-    # Physical metrics comparison
-    physical_metrics = {
-        'Flexibility': [before_data['flexibility'], after_data['flexibility']],
-        'Strength': [before_data['strength'], after_data['strength']],
-        'Balance': [before_data['balance'], after_data['balance']],
-        'Pain Level': [before_data['pain'], after_data['pain']],
-        'Posture': [before_data['posture'], after_data['posture']],
-        'Breathing': [before_data['breathing'], after_data['breathing']],
-        'Spine': [before_data['spine'], after_data['spine']],
-        'Hips': [before_data['hips'], after_data['hips']],
-        'Shoulders': [before_data['shoulders'], after_data['shoulders']],
-        'Core': [before_data['core'], after_data['core']]
-    }
-    
-    # Mental metrics comparison
-    mental_metrics = {
-        'Stress': [before_data['stress'], after_data['stress']],
-        'Energy': [before_data['energy'], after_data['energy']],
-        'Focus': [before_data['focus'], after_data['focus']],
-        'Sleep': [before_data['sleep'], after_data['sleep']],
-        'Anxiety': [before_data['anxiety'], after_data['anxiety']],
-        'Mood': [before_data['mood'], after_data['mood']],
-        'Mindfulness': [before_data['mindfulness'], after_data['mindfulness']]
-    }
+    import plotly.graph_objects as go
     
-    # Create dataframes and charts
-    physical_df = pd.DataFrame(physical_metrics, index=['Before', 'After']).transpose()
-    mental_df = pd.DataFrame(mental_metrics, index=['Before', 'After']).transpose()
+    # One (2, n_metrics) array: row 0 is before, row 1 is after
+    scores = assessment_scores(before_data, after_data, METRIC_KEYS)
+    n_physical = len(PHYSICAL_KEYS)
     
-    fig1 = px.bar(physical_df, barmode='group', title='Physical Metrics Comparison')
-    fig2 = px.bar(mental_df, barmode='group', title='Mental & Emotional Metrics Comparison')
+    figures = []
+    for labels, values, title in [
+        (PHYSICAL_LABELS, scores[:, :n_physical], 'Physical Metrics Comparison'),
+        (MENTAL_LABELS, scores[:, n_physical:], 'Mental & Emotional Metrics Comparison')
+    ]:
+        fig = go.Figure(data=[
+            go.Bar(name='Before', x=labels, y=values[0]),
+            go.Bar(name='After', x=labels, y=values[1])
+        ])
+        fig.update_layout(barmode='group', title=title)
+        figures.append(fig)
     
+    fig1, fig2 = figures
     return fig1, fig2
 
+def _metric_lines(metrics, before_data, after_data):
+    """Format one 'Label: Before x/10 → After y/10' prompt line per metric."""
+    return "\n".join(
+        f"{label}: Before {before_data[key]}/10 → After {after_data[key]}/10"
+        for label, key in metrics
+    )
+
+# Cached on the assessment inputs; on a hit Streamlit replays the streamed
+# output instead of calling Groq again.
+@st.cache_data(ttl=3600, max_entries=50, show_spinner=False, hash_funcs=_CACHE_HASH_FUNCS)
 def generate_analysis(before_data, after_data, client_info):
-    prompt = f"""
-    As an expert yoga trainer and wellness analyst, provide a detailed progress analysis for:
-    
-    CLIENT PROFILE:
-    Name: {client_info['name']}
-    Age: {client_info['age']}
-    Occupation: {client_info['occupation']}
-    Previous Yoga Experience: {client_info['previous_yoga_experience']}
-    Primary Goals: {', '.join(client_info['primary_goals'])}
-    
-    COMPREHENSIVE ASSESSMENT COMPARISON:
-    
-    1. PHYSICAL METRICS ANALYSIS:
-    
-    Basic Metrics:
-    Flexibility: Before {before_data['flexibility']}/10 → After {after_data['flexibility']}/10
-    Strength: Before {before_data['strength']}/10 → After {after_data['strength']}/10
-    Balance: Before {before_data['balance']}/10 → After {after_data['balance']}/10
-    Pain Levels: Before {before_data['pain']}/10 → After {after_data['pain']}/10
-    
-    Detailed Physical Assessment:
-    Posture: Before {before_data['posture']}/10 → After {after_data['posture']}/10
-    Breathing: Before {before_data['breathing']}/10 → After {after_data['breathing']}/10
-    Spine Flexibility: Before {before_data['spine']}/10 → After {after_data['spine']}/10
-    Hip Mobility: Before {before_data['hips']}/10 → After {after_data['hips']}/10
-    Shoulder Mobility: Before {before_data['shoulders']}/10 → After {after_data['shoulders']}/10
-    Core Strength: Before {before_data['core']}/10 → After {after_data['core']}/10
-    
-    2. MENTAL & EMOTIONAL METRICS:
-    
-    Stress Levels: Before {before_data['stress']}/10 → After {after_data['stress']}/10
-    Energy Levels: Before {before_data['energy']}/10 → After {after_data['energy']}/10
-    Focus & Clarity: Before {before_data['focus']}/10 → After {after_data['focus']}/10
-    Sleep Quality: Before {before_data['sleep']}/10 → After {after_data['sleep']}/10
-    Anxiety Levels: Before {before_data['anxiety']}/10 → After {after_data['anxiety']}/10
-    Overall Mood: Before {before_data['mood']}/10 → After {after_data['mood']}/10
-    Mindfulness: Before {before_data['mindfulness']}/10 → After {after_data['mindfulness']}/10
-    
-    Lifestyle Factors:
-    - Work Activity Level: {client_info['work_activity_level']}
-    - Exercise Routine: {client_info['exercise_routine']}
-    - Sleep Hours: {client_info['sleep_hours']}
-    - Diet Type: {client_info['diet_type']}
-    - Stress Sources: {', '.join(client_info['stress_sources'])}
-    
-    Initial Limitations/Symptoms:
-    {before_data['limitations']}
-    {before_data['symptoms']}
-    
-    Current Notes:
-    Before: {before_data['notes']}
-    After: {after_data['notes']}
-    
-    Please provide a detailed analysis with the following sections:
-
-    1. EXECUTIVE SUMMARY
-    Provide a concise overview of the client's overall progress and key achievements.
-
-    2. PHYSICAL PROGRESS ANALYSIS
-    - Detailed analysis of improvements in all physical metrics
-    - Specific areas of notable improvement
-    - Areas requiring continued attention
-    
-    3. MENTAL & EMOTIONAL WELLNESS PROGRESS
-    - Comprehensive analysis of mental and emotional improvements
-    - Impact on daily life and wellbeing
-    - Notable behavioral changes
-    
-    4. KEY ACHIEVEMENTS
-    List the top 3-5 most significant improvements observed.
-    
-    5. AREAS FOR FOCUS
-    Identify 2-3 specific areas that need continued attention and work.
-    
-    6. PERSONALIZED RECOMMENDATIONS
-    Provide 4-5 specific, actionable recommendations for:
-    - Poses or exercises to practice
-    - Lifestyle adjustments
-    - Mental wellness practices
-    - Sleep hygiene improvements (if applicable)
-    
-    7. LONG-TERM OUTLOOK
-    - Projected benefits if current progress continues
-    - Potential milestones to work towards
-    - Timeline expectations
-    
-    8. MOTIVATIONAL INSIGHTS
-    End with a personalized motivational message that:
-    - Acknowledges their progress
-    - Encourages continued dedication
-    - Highlights their potential for further growth
-
-    Please format the response clearly with headers and bullet points where appropriate.
-    Focus on being specific, actionable, and encouraging while maintaining a professional tone.
-    """
-    
-    response = groq_client.chat.completions.create(
-        messages=[{"role": "user", "content": prompt}],
-        model="meta-llama/llama-4-maverick-17b-128e-instruct",
-        temperature=0.7,
-        max_tokens=3000,
-        top_p=0.95,
-        stream=False
+    prompt = _ANALYSIS_TEMPLATE.format(
+        basic_metrics=_metric_lines(BASIC_PHYSICAL_METRICS, before_data, after_data),
+        detailed_metrics=_metric_lines(DETAILED_PHYSICAL_METRICS, before_data, after_data),
+        mental_metrics=_metric_lines(MENTAL_METRICS, before_data, after_data),
+        client=client_info,
+        before=before_data,
+        after=after_data,
+        primary_goals=', '.join(client_info['primary_goals']),
+        stress_sources=', '.join(client_info['stress_sources'])
     )
     
-    return response.choices[0].message.content
+    return st.write_stream(stream_completion(prompt, max_tokens=ANALYSIS_MAX_TOKENS))
 
 def set_custom_style():
-    st.markdown("""
-        <style>
-        /* Main container */
-        .main {
-            padding: 2rem;
-        }
-        
-        /* Headers */
-        h1 {
-            color: #2E4057;
-            padding-bottom: 1.5rem;
-        }
-        
-        h2 {
-            color: #2E4057;
-            font-size: 1.8rem;
-            padding: 1rem 0;
-        }
-        
-        h3 {
-            color: #2E4057;
-            font-size: 1.4rem;
-            padding: 0.8rem 0;
-        }
-        
-        /* Slider styling */
-        .stSlider {
-            padding: 1rem 0;
-        }
-        
-        .stSlider > div > div {
-            background-color: #f0f2f6;
-        }
-        
-        /* Tabs styling */
-        .stTabs [data-baseweb="tab-list"] {
-            gap: 2rem;
-        }
-        
-        .stTabs [data-baseweb="tab"] {
-            height: 50px;
-            padding: 0 20px;
-            background-color: #ffffff;
-            border-radius: 5px 5px 0 0;
-            color: #2E4057;
-            font-weight: 600;
-        }
-        
-        .stTabs [aria-selected="true"] {
-            background-color: #2E4057;
-            color: #ffffff;
-        }
-        
-        /* Input fields */
-        .stTextInput > div > div {
-            background-color: #ffffff;
-            border-radius: 5px;
-        }
-        
-        /* Cards for metric groups */
-        .metric-card {
-            background-color: #ffffff;
-            padding: 1.5rem;
-            border-radius: 10px;
-            box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-            margin-bottom: 1rem;
-        }
-        </style>
-    """, unsafe_allow_html=True)
+    # Re-emitted on every rerun: Streamlit drops elements a rerun doesn't
+    # repeat, but it diffs identical markdown so the browser skips the DOM write
+    st.markdown(_CSS, unsafe_allow_html=True)
 
 def create_metric_card(title, content):
-    st.markdown(f"""
-        <div class="metric-card">
-            <h3>{title}</h3>
-            {content}
-        </div>
-    """, unsafe_allow_html=True)
+    st.markdown(_CARD_TPL.format(title, content), unsafe_allow_html=True)
 
+@st.cache_data(ttl=3600, max_entries=50, show_spinner=False, hash_funcs=_CACHE_HASH_FUNCS)
 def generate_dietary_plan(client_info, before_data, after_data):
     prompt = f"""
     As a professional nutritionist, create a detailed 7-day meal plan for:
@@ -368,18 +459,101 @@ def generate_dietary_plan(client_info, before_data, after_data):
     Please maintain this exact format for all 7 days.
     """
     
-    response = groq_client.chat.completions.create(
-        messages=[{"role": "user", "content": prompt}],
-        model="meta-llama/llama-4-maverick-17b-128e-instruct",
-        temperature=0.7,
-        max_tokens=3000,
-        top_p=0.95,
-        stream=False
-    )
+    return st.write_stream(stream_completion(prompt, max_tokens=DIET_PLAN_MAX_TOKENS))
+
+# Table styles shared by every PDF export, built on first use and never mutated
+@st.cache_resource
+def get_table_styles():
+    """Build the (metric, diet) table styles once ReportLab is first needed."""
+    from reportlab.lib import colors
+    from reportlab.platypus import TableStyle
+    
+    metric_style = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2E4057')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 12),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+        ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
+        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 1), (-1, -1), 10),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('ALIGN', (1, 1), (-1, -1), 'CENTER'),
+    ])
+    
+    diet_style = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2E4057')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 9),
+        ('PADDING', (0, 0), (-1, -1), 6),
+        ('GRID', (0, 0), (-1, -1), 1, colors.grey),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+        ('WORDWRAP', (0, 0), (-1, -1), True)
+    ])
+    
+    return metric_style, diet_style
+
+def _bar_chart_drawing(fig, width=500, height=250):
+    """Redraw a grouped Plotly bar chart as a ReportLab vector drawing."""
+    from reportlab.lib import colors
+    from reportlab.graphics.shapes import Drawing
+    from reportlab.graphics.charts.barcharts import VerticalBarChart
+    from reportlab.graphics.charts.legends import Legend
+    
+    drawing = Drawing(width, height)
+    
+    chart = VerticalBarChart()
+    chart.x = 40
+    chart.y = 60
+    chart.width = width - 60
+    chart.height = height - 90
+    chart.data = [tuple(trace.y) for trace in fig.data]
+    chart.categoryAxis.categoryNames = [str(name) for name in fig.data[0].x]
+    chart.categoryAxis.labels.angle = 30
+    chart.categoryAxis.labels.boxAnchor = 'ne'
+    chart.categoryAxis.labels.fontSize = 8
+    chart.valueAxis.valueMin = 0
+    chart.valueAxis.valueMax = 10
+    chart.valueAxis.valueStep = 2
+    chart.bars[0].fillColor = colors.HexColor('#2E4057')
+    chart.bars[1].fillColor = colors.HexColor('#66A182')
+    drawing.add(chart)
     
-    return response.choices[0].message.content
+    legend = Legend()
+    legend.x = width - 120
+    legend.y = height - 5
+    legend.fontSize = 8
+    legend.columnMaximum = 1
+    legend.deltax = 60
+    legend.colorNamePairs = [(chart.bars[i].fillColor, trace.name) for i, trace in enumerate(fig.data)]
+    drawing.add(legend)
+    
+    return drawing
+
+def _build_table(metrics, before_data, after_data):
+    """Build the Metric/Before/After/Change rows for a PDF summary table."""
+    labels, keys = zip(*metrics)
+    before, after = assessment_scores(before_data, after_data, keys)
+    df = pd.DataFrame({'Metric': labels, 'Before': before, 'After': after})
+    df['Change'] = pd.Series(after - before).map('{:+d}'.format)
+    df['Before'] = df['Before'].astype(str) + '/10'
+    df['After'] = df['After'].astype(str) + '/10'
+    return [df.columns.tolist()] + df.values.tolist()
 
-def create_pdf(client_info, analysis, before_data, after_data, fig1, fig2):
+# The figures are derived from before/after data, so they are left out of the cache key
+@st.cache_data(ttl=3600, max_entries=50, show_spinner=False, hash_funcs=_CACHE_HASH_FUNCS)
+def create_pdf(client_info, analysis, before_data, after_data, _fig1, _fig2):
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table
+    
+    metric_table_style, _ = get_table_styles()
     buffer = BytesIO()
     doc = SimpleDocTemplate(
         buffer, 
@@ -449,84 +623,41 @@ def create_pdf(client_info, analysis, before_data, after_data, fig1, fig2):
     
     # Add charts with better formatting
     for fig, title in [
-        (fig1, "Physical Metrics Comparison"),
-        (fig2, "Mental & Emotional Metrics Comparison")
+        (_fig1, "Physical Metrics Comparison"),
+        (_fig2, "Mental & Emotional Metrics Comparison")
     ]:
         story.append(Paragraph(title, styles['CustomBody']))
-        img_bytes = pio.to_image(fig, format="png", width=800, height=400, scale=2)
-        img_stream = BytesIO(img_bytes)
-        img = Image(img_stream)
-        img.drawHeight = 4*inch
-        img.drawWidth = 7*inch
-        story.append(img)
+        story.append(_bar_chart_drawing(fig))
         story.append(Spacer(1, 20))
     
     # Summary Tables
     story.append(Paragraph("Progress Summary", styles['CustomHeading2']))
     
     # Physical Metrics Summary Table
-    physical_data = [
-        ['Metric', 'Before', 'After', 'Change'],
-        ['Flexibility', f"{before_data['flexibility']}/10", f"{after_data['flexibility']}/10", 
-         f"{after_data['flexibility'] - before_data['flexibility']:+d}"],
-        ['Strength', f"{before_data['strength']}/10", f"{after_data['strength']}/10",
-         f"{after_data['strength'] - before_data['strength']:+d}"],
-        ['Balance', f"{before_data['balance']}/10", f"{after_data['balance']}/10",
-         f"{after_data['balance'] - before_data['balance']:+d}"],
-        ['Posture', f"{before_data['posture']}/10", f"{after_data['posture']}/10",
-         f"{after_data['posture'] - before_data['posture']:+d}"],
-        ['Core Strength', f"{before_data['core']}/10", f"{after_data['core']}/10",
-         f"{after_data['core'] - before_data['core']:+d}"]
-    ]
+    physical_data = _build_table([
+        ('Flexibility', 'flexibility'),
+        ('Strength', 'strength'),
+        ('Balance', 'balance'),
+        ('Posture', 'posture'),
+        ('Core Strength', 'core')
+    ], before_data, after_data)
     
     physical_table = Table(physical_data, colWidths=[120, 80, 80, 80])
-    physical_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2E4057')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 12),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-        ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 10),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('ALIGN', (1, 1), (-1, -1), 'CENTER'),
-    ]))
+    physical_table.setStyle(metric_table_style)
     story.append(physical_table)
     story.append(Spacer(1, 20))
     
     # Mental Metrics Summary Table
-    mental_data = [
-        ['Metric', 'Before', 'After', 'Change'],
-        ['Stress', f"{before_data['stress']}/10", f"{after_data['stress']}/10",
-         f"{after_data['stress'] - before_data['stress']:+d}"],
-        ['Energy', f"{before_data['energy']}/10", f"{after_data['energy']}/10",
-         f"{after_data['energy'] - before_data['energy']:+d}"],
-        ['Focus', f"{before_data['focus']}/10", f"{after_data['focus']}/10",
-         f"{after_data['focus'] - before_data['focus']:+d}"],
-        ['Sleep', f"{before_data['sleep']}/10", f"{after_data['sleep']}/10",
-         f"{after_data['sleep'] - before_data['sleep']:+d}"],
-        ['Mindfulness', f"{before_data['mindfulness']}/10", f"{after_data['mindfulness']}/10",
-         f"{after_data['mindfulness'] - before_data['mindfulness']:+d}"]
-    ]
+    mental_data = _build_table([
+        ('Stress', 'stress'),
+        ('Energy', 'energy'),
+        ('Focus', 'focus'),
+        ('Sleep', 'sleep'),
+        ('Mindfulness', 'mindfulness')
+    ], before_data, after_data)
     
     mental_table = Table(mental_data, colWidths=[120, 80, 80, 80])
-    mental_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2E4057')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 12),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-        ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 10),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('ALIGN', (1, 1), (-1, -1), 'CENTER'),
-    ]))
+    mental_table.setStyle(metric_table_style)
     story.append(mental_table)
     story.append(Spacer(1, 30))
     
@@ -549,10 +680,28 @@ def create_pdf(client_info, analysis, before_data, after_data, fig1, fig2):
     
     # Build PDF
     doc.build(story)
-    buffer.seek(0)
-    return buffer
+    return buffer.getvalue()
+
+def _append_meal_tables(story, meal_data):
+    """Append meal rows as tables of at most MEAL_TABLE_MAX_ROWS rows, each with the header row."""
+    from reportlab.platypus import Table, PageBreak
+    
+    _, diet_table_style = get_table_styles()
+    header, rows = meal_data[:1], meal_data[1:]
+    for start in range(0, len(rows), MEAL_TABLE_MAX_ROWS):
+        if start:
+            story.append(PageBreak())
+        table = Table(header + rows[start:start + MEAL_TABLE_MAX_ROWS], colWidths=[120, 300, 200, 80], repeatRows=1)
+        table.setStyle(diet_table_style)
+        story.append(table)
 
+@st.cache_data(ttl=3600, max_entries=50, show_spinner=False, hash_funcs=_CACHE_HASH_FUNCS)
 def create_diet_pdf(client_info, dietary_plan):
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import letter, landscape
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+    
     buffer = BytesIO()
     doc = SimpleDocTemplate(
         buffer,
@@ -618,6 +767,11 @@ def create_diet_pdf(client_info, dietary_plan):
     
     # Process the dietary plan text
     lines = dietary_plan.split('\n')
+    
+    # Classify every line once so the scan below stays a single pass
+    is_day = [_DAY_RE.search(line) is not None for line in lines]
+    is_meal = [_MEAL_RE.search(line) is not None for line in lines]
+    
     i = 0
     while i < len(lines):
         line = lines[i].strip()
@@ -626,23 +780,10 @@ def create_diet_pdf(client_info, dietary_plan):
             continue
         
         # Check if this is a day header
-        if any(day in line for day in ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']):
+        if is_day[i]:
             # Add previous day's table if it exists
             if meal_data and len(meal_data) > 1:
-                table = Table(meal_data, colWidths=[120, 300, 200, 80])
-                table.setStyle(TableStyle([
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2E4057')),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                    ('FONTSIZE', (0, 0), (-1, -1), 9),
-                    ('PADDING', (0, 0), (-1, -1), 6),
-                    ('GRID', (0, 0), (-1, -1), 1, colors.grey),
-                    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                    ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-                    ('WORDWRAP', (0, 0), (-1, -1), True)
-                ]))
-                story.append(table)
+                _append_meal_tables(story, meal_data)
                 story.append(Spacer(1, 15))
             
             current_day = line
@@ -652,15 +793,15 @@ def create_diet_pdf(client_info, dietary_plan):
             continue
         
         # Process meal entry
-        if any(meal in line for meal in ['Breakfast', 'Morning Snack', 'Lunch', 'Afternoon Snack', 'Dinner']):
+        if is_meal[i]:
             meal_time = line
+            i += 1
             details = []
             nutrients = []
             prep_time = ''
             
             # Collect all information for this meal
-            while i < len(lines) and not any(next_meal in lines[i] for next_meal in 
-                  ['Breakfast', 'Morning Snack', 'Lunch', 'Afternoon Snack', 'Dinner']):
+            while i < len(lines) and not is_meal[i]:
                 line = lines[i].strip()
                 if line.startswith('Main:') or line.startswith('Alternative:'):
                     details.append(line)
@@ -673,7 +814,7 @@ def create_diet_pdf(client_info, dietary_plan):
                     break
             
             # Add meal to table
-            if details and nutrients:
+            if meal_data and details and nutrients:
                 meal_data.append([
                     meal_time,
                     '\n'.join(details),
@@ -686,56 +827,30 @@ def create_diet_pdf(client_info, dietary_plan):
     
     # Add the last table if it exists
     if meal_data and len(meal_data) > 1:
-        table = Table(meal_data, colWidths=[120, 300, 200, 80])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2E4057')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 9),
-            ('PADDING', (0, 0), (-1, -1), 6),
-            ('GRID', (0, 0), (-1, -1), 1, colors.grey),
-            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-            ('WORDWRAP', (0, 0), (-1, -1), True)
-        ]))
-        story.append(table)
+        _append_meal_tables(story, meal_data)
     
     # Build PDF
     doc.build(story)
-    buffer.seek(0)
-    return buffer
+    return buffer.getvalue()
+
+def render_metric_sliders(data, phase, key_prefix):
+    """Draw the before/after score sliders, starting from data, and return the chosen scores."""
+    # One column per metric group, created once and filled in a single pass
+    bucket = dict(zip((category for category, _ in METRIC_GROUPS), st.columns(len(METRIC_GROUPS))))
+    for category, heading in METRIC_GROUPS:
+        bucket[category].markdown(heading)
+    # Returned rather than written into data, so unsaved scores stay None until submit
+    return {
+        key: bucket[category].slider(f"{label} ({phase})", 0, 10, value=data[key], key=f"{key_prefix}_{key}")
+        for label, key, category in METRICS
+    }
 
 def main():
     initialize_session_state()
     set_custom_style()
     
-    # Initialize client_info at the start of main
-    client_info = {
-        'name': '',
-        'age': 0,
-        'occupation': '',
-        'previous_yoga_experience': '',
-        'primary_goals': [],
-        'specific_concerns': '',
-        'work_activity_level': '',
-        'stress_sources': [],
-        'exercise_routine': '',
-        'sleep_hours': 7,
-        'diet_type': '',
-        'current_medications': '',
-        'height': 170,
-        'weight': 70,
-        'target_weight': 70,
-        'dietary_restrictions': [],
-        'food_allergies': '',
-        'preferred_cuisine': [],
-        'meal_prep_time': 30,
-        'medical_conditions': '',
-        'digestive_issues': '',
-        'health_goals': [],
-        'nutritional_needs': ''
-    }
+    # Widgets below write straight into the session's client_info
+    client_info = st.session_state.client_info
     
     # Update the title with icon and better styling
     st.markdown("# 🧘‍♀️ Yoga Progress Analysis")
@@ -745,9 +860,9 @@ def main():
     
     col1, col2, col3 = st.columns([2, 1, 1])
     with col1:
-        client_name = st.text_input("Client Name", placeholder="Enter client's full name")
+        client_info['name'] = st.text_input("Client Name", placeholder="Enter client's full name", key='client_name')
     with col2:
-        client_age = st.number_input("Age", 18, 100, value=25)
+        client_info['age'] = st.number_input("Age", 18, 100, value=25, key='client_age')
     with col3:
         assessment_date = st.date_input("Assessment Date")
     
@@ -755,160 +870,108 @@ def main():
     with col1:
         session_type = st.selectbox(
             "Session Type",
-            ["In-person", "Online", "Healing-focused"],
+            _SESSION_TYPES,
             index=0
         )
     with col2:
-        previous_yoga_experience = st.selectbox(
+        client_info['previous_yoga_experience'] = st.selectbox(
             "Previous Yoga Experience",
-            ["None", "Beginner", "Intermediate", "Advanced"],
-            index=0
+            _YOGA_EXPERIENCE_LEVELS,
+            index=0,
+            key='client_yoga_experience'
         )
 
-    # Create tabs with better styling
-    tabs = st.tabs(["📝 Before Assessment", "📈 After Assessment", "📊 Analysis", "🥗 Diet Plan"])
+    # Only the selected section runs, so charts, LLM calls and PDFs are skipped elsewhere
+    section = st.radio(
+        "Section",
+        ["📝 Before Assessment", "📈 After Assessment", "📊 Analysis", "🥗 Diet Plan"],
+        horizontal=True,
+        label_visibility="collapsed",
+        key="active_tab"
+    )
     
-    with tabs[0]:
+    if section == "📝 Before Assessment":
         st.markdown("## Before Assessment")
         
-        # Physical Metrics Card
-        col1, col2 = st.columns(2)
-        with col1:
-            with st.container():
-                st.markdown("### 💪 Physical Metrics")
-                before_flexibility = st.slider("Flexibility Level (Before)", 0, 10, key='b_flex')
-                before_strength = st.slider("Strength Level (Before)", 0, 10, key='b_str')
-                before_balance = st.slider("Balance Score (Before)", 0, 10, key='b_bal')
-                before_pain = st.slider("Pain Level (Before)", 0, 10, key='b_pain')
-                before_posture = st.slider("Posture (Before)", 0, 10, key='b_posture')
-                before_breathing = st.slider("Breathing Level (Before)", 0, 10, key='b_breathing')
-                before_spine = st.slider("Spine Flexibility Level (Before)", 0, 10, key='b_spine')
-                before_hips = st.slider("Hip Mobility Level (Before)", 0, 10, key='b_hips')
-                before_shoulders = st.slider("Shoulder Mobility Level (Before)", 0, 10, key='b_shoulders')
-                before_core = st.slider("Core Strength Level (Before)", 0, 10, key='b_core')
-            with st.container():
-                st.markdown("### 🧘‍♀️ Mental & Emotional Metrics")
-                before_stress = st.slider("Stress Level (Before)", 0, 10, key='b_stress')
-                before_energy = st.slider("Energy Level (Before)", 0, 10, key='b_energy')
-                before_focus = st.slider("Focus & Clarity (Before)", 0, 10, key='b_focus')
-                before_sleep = st.slider("Sleep Quality (Before)", 0, 10, key='b_sleep')
-                before_anxiety = st.slider("Anxiety Level (Before)", 0, 10, key='b_anxiety')
-                before_mood = st.slider("Overall Mood (Before)", 0, 10, key='b_mood')
-                before_mindfulness = st.slider("Mindfulness (Before)", 0, 10, key='b_mindfulness')
-        
-        before_notes = st.text_area("Additional Notes (Before)")
-        before_limitations = st.text_area("Current Limitations (Before)")
-        before_symptoms = st.text_area("Current Symptoms (Before)")
-        
-        if st.button("Save Before Assessment"):
-            st.session_state.before_data.update({
-                'flexibility': before_flexibility,
-                'strength': before_strength,
-                'balance': before_balance,
-                'pain': before_pain,
-                'posture': before_posture,
-                'breathing': before_breathing,
-                'spine': before_spine,
-                'hips': before_hips,
-                'shoulders': before_shoulders,
-                'core': before_core,
-                'stress': before_stress,
-                'energy': before_energy,
-                'focus': before_focus,
-                'sleep': before_sleep,
-                'anxiety': before_anxiety,
-                'mood': before_mood,
-                'mindfulness': before_mindfulness,
-                'notes': before_notes,
-                'limitations': before_limitations,
-                'symptoms': before_symptoms
-            })
-            st.success("Before assessment saved!")
-
-    with tabs[1]:
+        # A form batches every slider change into a single rerun on save
+        with st.form("before_form", clear_on_submit=False):
+            before_scores = render_metric_sliders(st.session_state.before_data, "Before", "b")
+            
+            # Keyed and seeded once, like the diet widgets, so a value= that changes on save
+            # does not give the area a new identity and drop the next edit
+            for field in ('notes', 'limitations', 'symptoms'):
+                st.session_state.setdefault(f"b_{field}", st.session_state.before_data[field])
+            before_notes = st.text_area("Additional Notes (Before)", key="b_notes")
+            before_limitations = st.text_area("Current Limitations (Before)", key="b_limitations")
+            before_symptoms = st.text_area("Current Symptoms (Before)", key="b_symptoms")
+            
+            if st.form_submit_button("Save Before Assessment"):
+                st.session_state.before_data.update(
+                    before_scores,
+                    notes=before_notes,
+                    limitations=before_limitations,
+                    symptoms=before_symptoms
+                )
+                st.success("Before assessment saved!")
+
+    elif section == "📈 After Assessment":
         st.markdown("## After Assessment")
         
-        # Physical Metrics Card
-        col1, col2 = st.columns(2)
-        with col1:
-            with st.container():
-                st.markdown("### 💪 Physical Metrics")
-                after_flexibility = st.slider("Flexibility Level (After)", 0, 10, key='a_flex')
-                after_strength = st.slider("Strength Level (After)", 0, 10, key='a_str')
-                after_balance = st.slider("Balance Score (After)", 0, 10, key='a_bal')
-                after_pain = st.slider("Pain Level (After)", 0, 10, key='a_pain')
-                after_posture = st.slider("Posture (After)", 0, 10, key='a_posture')
-                after_breathing = st.slider("Breathing Level (After)", 0, 10, key='a_breathing')
-                after_spine = st.slider("Spine Flexibility Level (After)", 0, 10, key='a_spine')
-                after_hips = st.slider("Hip Mobility Level (After)", 0, 10, key='a_hips')
-                after_shoulders = st.slider("Shoulder Mobility Level (After)", 0, 10, key='a_shoulders')
-                after_core = st.slider("Core Strength Level (After)", 0, 10, key='a_core')
-            with st.container():
-                st.markdown("### 🧘‍♀️ Mental & Emotional Metrics")
-                after_stress = st.slider("Stress Level (After)", 0, 10, key='a_stress')
-                after_energy = st.slider("Energy Level (After)", 0, 10, key='a_energy')
-                after_focus = st.slider("Focus & Clarity (After)", 0, 10, key='a_focus')
-                after_sleep = st.slider("Sleep Quality (After)", 0, 10, key='a_sleep')
-                after_anxiety = st.slider("Anxiety Level (After)", 0, 10, key='a_anxiety')
-                after_mood = st.slider("Overall Mood (After)", 0, 10, key='a_mood')
-                after_mindfulness = st.slider("Mindfulness (After)", 0, 10, key='a_mindfulness')
-        
-        after_notes = st.text_area("Additional Notes (After)")
-        
-        if st.button("Save After Assessment"):
-            st.session_state.after_data.update({
-                'flexibility': after_flexibility,
-                'strength': after_strength,
-                'balance': after_balance,
-                'pain': after_pain,
-                'posture': after_posture,
-                'breathing': after_breathing,
-                'spine': after_spine,
-                'hips': after_hips,
-                'shoulders': after_shoulders,
-                'core': after_core,
-                'stress': after_stress,
-                'energy': after_energy,
-                'focus': after_focus,
-                'sleep': after_sleep,
-                'anxiety': after_anxiety,
-                'mood': after_mood,
-                'mindfulness': after_mindfulness,
-                'notes': after_notes
-            })
-            st.success("After assessment saved!")
-
-    with tabs[2]:
+        with st.form("after_form", clear_on_submit=False):
+            after_scores = render_metric_sliders(st.session_state.after_data, "After", "a")
+            
+            st.session_state.setdefault("a_notes", st.session_state.after_data['notes'])
+            after_notes = st.text_area("Additional Notes (After)", key="a_notes")
+            
+            if st.form_submit_button("Save After Assessment"):
+                st.session_state.after_data.update(after_scores, notes=after_notes)
+                st.success("After assessment saved!")
+
+    elif section == "📊 Analysis":
         st.markdown("## Progress Analysis")
         
         if st.button("Generate Analysis"):
-            if (not st.session_state.before_data.get('flexibility') and 
-                not st.session_state.after_data.get('flexibility')):
+            if (st.session_state.before_data['flexibility'] is None or
+                st.session_state.after_data['flexibility'] is None):
                 st.error("Please complete and save both before and after assessments first!")
             else:
                 try:
                     with st.spinner("Generating your progress report..."):
-                        # Generate charts
-                        fig1, fig2 = create_comparison_charts(
-                            st.session_state.before_data, 
-                            st.session_state.after_data
-                        )
-                        
-                        # Display charts
-                        st.plotly_chart(fig1)
-                        st.plotly_chart(fig2)
-                        
-                        # Generate analysis
-                        analysis = generate_analysis(
+                        # Identical inputs to the last run reuse its figures and analysis
+                        analysis_key = _hash_dict([
                             st.session_state.before_data,
                             st.session_state.after_data,
                             client_info
-                        )
+                        ])
+                        reuse = st.session_state.get('analysis_key') == analysis_key
+                        
+                        # Generate charts
+                        if reuse:
+                            fig1, fig2, analysis = st.session_state.analysis_cache
+                        else:
+                            fig1, fig2 = create_comparison_charts(
+                                st.session_state.before_data, 
+                                st.session_state.after_data
+                            )
+                        
+                        # Display charts
+                        st.plotly_chart(fig1, width="stretch", config=_PLOTLY_CONFIG)
+                        st.plotly_chart(fig2, width="stretch", config=_PLOTLY_CONFIG)
                         
+                        # Stream analysis as it is generated
                         st.subheader("Your Progress Journey")
-                        st.write(analysis)
+                        if reuse:
+                            st.markdown(analysis)
+                        else:
+                            analysis = generate_analysis(
+                                st.session_state.before_data,
+                                st.session_state.after_data,
+                                client_info
+                            )
+                            st.session_state.analysis_key = analysis_key
+                            st.session_state.analysis_cache = (fig1, fig2, analysis)
                         
-                        # Generate PDF report and store in session state
+                        # Generate PDF report; the cached builder holds the bytes, not the session
                         progress_pdf = create_pdf(
                             client_info,
                             analysis,
@@ -918,15 +981,12 @@ def main():
                             fig2
                         )
                         
-                        # Store PDF data in session state
-                        st.session_state.progress_pdf = progress_pdf.getvalue()
-                        
                         # Add PDF download button with improved styling
                         st.markdown("### 📥 Download Your Progress Report")
                         st.download_button(
                             label="Download Complete Progress Report (PDF)",
-                            data=st.session_state.progress_pdf,
-                            file_name=f"yoga_progress_report_{client_info['name']}_{datetime.now().strftime('%Y%m%d')}.pdf",
+                            data=progress_pdf,
+                            file_name=f"yoga_progress_report_{client_info['name']}_{st.session_state.session_date}.pdf",
                             mime="application/pdf",
                             help="Click to download your detailed progress report including charts and analysis"
                         )
@@ -934,66 +994,76 @@ def main():
                 except Exception as e:
                     st.error(f"An error occurred: {str(e)}")
 
-    with tabs[3]:
+    elif section == "🥗 Diet Plan":
         st.markdown("## 🥗 Personalized Diet Planning")
         
+        # Seed each widget from client_info only when its key is missing (first visit, or
+        # after Streamlit dropped it while another section was shown). Passing value=/default=
+        # every run would change the widget's identity and discard the pending edit.
+        for field in _DIET_FIELDS:
+            value = client_info[field]
+            st.session_state.setdefault(f"diet_{field}", list(value) if isinstance(value, tuple) else value)
+        
         col1, col2 = st.columns(2)
         with col1:
-            client_info['height'] = st.number_input("Height (cm)", 140, 220, value=170)
-            client_info['weight'] = st.number_input("Weight (kg)", 30, 200, value=70)
-            client_info['target_weight'] = st.number_input("Target Weight (kg)", 30, 200, value=client_info['weight'])
+            client_info['height'] = st.number_input("Height (cm)", 140, 220, key='diet_height')
+            client_info['weight'] = st.number_input("Weight (kg)", 30, 200, key='diet_weight')
+            client_info['target_weight'] = st.number_input("Target Weight (kg)", 30, 200, key='diet_target_weight')
             client_info['meal_prep_time'] = st.select_slider(
                 "Available Meal Prep Time (minutes/day)",
-                options=[15, 30, 45, 60, 90, 120],
-                value=30
+                options=_MEAL_PREP_TIMES,
+                key='diet_meal_prep_time'
             )
 
         with col2:
             client_info['dietary_restrictions'] = st.multiselect(
                 "Dietary Restrictions",
-                ["None", "Vegetarian", "Vegan", "Gluten-Free", "Dairy-Free", "Keto", "Paleo"],
-                default=["None"]
+                _DIET_RESTRICTIONS,
+                key='diet_dietary_restrictions'
             )
-            client_info['food_allergies'] = st.text_area("Food Allergies (if any)")
+            client_info['food_allergies'] = st.text_area("Food Allergies (if any)", key='diet_food_allergies')
             client_info['preferred_cuisine'] = st.multiselect(
                 "Preferred Cuisine Types",
-                ["Mediterranean", "Asian", "Indian", "Mexican", "American", "European"],
-                default=["Mediterranean"]
+                _CUISINES,
+                key='diet_preferred_cuisine'
             )
 
         col3, col4 = st.columns(2)
         with col3:
-            client_info['medical_conditions'] = st.text_area("Medical Conditions (if any)")
-            client_info['digestive_issues'] = st.text_area("Digestive Issues (if any)")
+            client_info['medical_conditions'] = st.text_area("Medical Conditions (if any)", key='diet_medical_conditions')
+            client_info['digestive_issues'] = st.text_area("Digestive Issues (if any)", key='diet_digestive_issues')
 
         with col4:
             client_info['health_goals'] = st.multiselect(
                 "Health Goals",
-                ["Weight Loss", "Muscle Gain", "Maintenance", "Energy Boost", 
-                 "Better Sleep", "Digestive Health", "Reduce Inflammation"],
-                default=["Maintenance"]
+                _HEALTH_GOALS,
+                key='diet_health_goals'
             )
-            client_info['nutritional_needs'] = st.text_area("Specific Nutritional Needs")
+            client_info['nutritional_needs'] = st.text_area("Specific Nutritional Needs", key='diet_nutritional_needs')
 
         if st.button("Generate Personalized Diet Plan"):
             try:
-                dietary_plan = generate_dietary_plan(client_info, st.session_state.before_data, st.session_state.after_data)
-                
-                # Display the plan in an organized way
                 st.markdown("### Your Personalized Diet Plan")
-                st.write(dietary_plan)
+                
+                # Identical client details to the last run reuse its plan
+                diet_key = _hash_dict(client_info)
+                if st.session_state.get('diet_key') == diet_key:
+                    dietary_plan = st.session_state.dietary_plan
+                    st.markdown(dietary_plan)
+                else:
+                    # Stream the plan as it is generated
+                    dietary_plan = generate_dietary_plan(client_info, st.session_state.before_data, st.session_state.after_data)
+                    st.session_state.diet_key = diet_key
+                    st.session_state.dietary_plan = dietary_plan
 
-                # Generate PDF for diet plan and store in session state
+                # Generate PDF for diet plan; the cached builder holds the bytes, not the session
                 diet_pdf = create_diet_pdf(client_info, dietary_plan)
                 
-                # Store PDF data in session state
-                st.session_state.diet_pdf = diet_pdf.getvalue()
-                
                 # Add PDF download button
                 st.download_button(
                     label="📥 Download Diet Plan (PDF)",
-                    data=st.session_state.diet_pdf,
-                    file_name=f"diet_plan_{client_info['name']}_{datetime.now().strftime('%Y%m%d')}.pdf",
+                    data=diet_pdf,
+                    file_name=f"diet_plan_{client_info['name']}_{st.session_state.session_date}.pdf",
                     mime="application/pdf",
                     help="Click to download your personalized diet plan"
                 )